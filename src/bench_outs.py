@@ -0,0 +1,58 @@
+import random
+import time
+
+from outs import deadwood_cover, score_discards
+from tracker import RANK, SUIT, CardTracker
+
+FRAME_MS = 16.0
+
+# Meld-dense hands close to a win, where the search has the most
+# overlapping runs and sets to choose from.
+DENSE_HANDS = [
+    ["4H", "5H", "6H", "7H", "4C", "5C", "6C", "7C", "4S", "5S", "6S"],
+    ["2H", "3H", "4H", "5H", "2C", "3C", "4C", "5C", "2S", "3S", "4S"],
+    ["AH", "2H", "3H", "4H", "5H", "6H", "7H", "AC", "AS", "2C", "2S"],
+    ["9H", "9C", "9S", "9D", "TH", "TC", "TS", "TD", "JH", "JC", "JS"],
+]
+
+
+def time_hand(stash_deck, card_tracker, number):
+    # Every run starts from a cold cache, as on the first hint of a game.
+    times = []
+    for _ in range(number):
+        deadwood_cover.cache_clear()
+        start = time.perf_counter()
+        score_discards(stash_deck, card_tracker)
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return times[len(times) // 2], times[-1]
+
+
+def report(name, median, worst):
+    status = "ok" if worst < FRAME_MS else "OVER BUDGET"
+    print("  {:<36} {:>7.2f} ms median {:>7.2f} ms max  {}".format(
+        name, median, worst, status))
+
+
+if __name__ == "__main__":
+    number = 20
+    print("dense hands")
+    for hand in DENSE_HANDS:
+        median, worst = time_hand(hand, CardTracker(), number)
+        report(" ".join(hand), median, worst)
+
+    print("random hands")
+    rng = random.Random(0)
+    deck = [(r + s) for s in SUIT for r in RANK]
+    medians = []
+    worst = 0
+    for _ in range(200):
+        rng.shuffle(deck)
+        card_tracker = CardTracker()
+        for card in deck[11:11 + rng.randint(0, 30)]:
+            card_tracker.see(card)
+        median, hand_worst = time_hand(deck[:11], card_tracker, 1)
+        medians.append(median)
+        worst = max(worst, hand_worst)
+    medians.sort()
+    report("200 hands", medians[len(medians) // 2], worst)
@@ -0,0 +1,66 @@
+import timeit
+
+from client import GameClient
+from protocol import NO_ARG, TEXT_ARG, CommandParser
+from server import Player
+
+SAMPLE_ARGS = {
+    "@ID": "0",
+    "@STASH": "AS",
+    "@STOCK": "7H",
+    "@DISCARD": "KD",
+    "@DRAW": "STOCK",
+    "@DROP": "7H",
+    "@ERROR": "Unknown command '@X'",
+}
+
+
+def noop(*args):
+    pass
+
+
+def noop_parser(commands):
+    # Same verbs and argument kinds as the real table, without side effects.
+    parser = CommandParser()
+    for verb, (_, arg_kind) in commands.handlers.items():
+        parser.register(verb, noop, arg=arg_kind)
+    return parser
+
+
+def sample_command(verb, arg_kind):
+    if arg_kind == NO_ARG:
+        return verb
+    return verb + " " + SAMPLE_ARGS[verb]
+
+
+def bench_verbs(name, parser, number):
+    print(name)
+    for verb, (_, arg_kind) in parser.handlers.items():
+        command = sample_command(verb, arg_kind)
+        seconds = timeit.timeit(
+            lambda: parser.dispatch(command), number=number)
+        print(
+            "  {:<24} {:>8.0f} ns/cmd {:>12,.0f} cmd/s".format(
+                command[:24], seconds / number * 1e9, number / seconds
+            )
+        )
+
+
+def bench_table_size(number):
+    print("table size")
+    for size in (10, 100, 1000, 10000):
+        parser = CommandParser()
+        for i in range(size):
+            parser.register("@VERB{}".format(i), noop, arg=TEXT_ARG)
+        command = "@VERB{} some text".format(size - 1)
+        seconds = timeit.timeit(
+            lambda: parser.dispatch(command), number=number)
+        print("  {:<24} {:>8.0f} ns/cmd".format(
+            str(size) + " verbs", seconds / number * 1e9))
+
+
+if __name__ == "__main__":
+    number = 200000
+    bench_verbs("server", noop_parser(Player(None).commands), number)
+    bench_verbs("client", noop_parser(GameClient(None).commands), number)
+    bench_table_size(number)
@@ -2,11 +2,14 @@ import logging
 import socket
 import struct
 import threading
-from itertools import permutations
 from tkinter import PhotoImage, StringVar, Tk, messagebox
 from tkinter.constants import DISABLED, NORMAL
 from tkinter.ttk import Button, Entry, Frame, Label, Radiobutton
 
+from outs import best_discard, deadwood, deadwood_mask, is_win
+from protocol import TEXT_ARG, WORD_ARG, CommandParser, ProtocolError
+from tracker import CARD_BIT, CardTracker, card_mask, mask_cards
+
 logging.basicConfig(level=logging.DEBUG)
 
 SUIT = ["H", "C", "S", "D"]
@@ -93,6 +96,11 @@ class App(Tk):
             self.stash_div, image=self.blank_card, variable=self.stash_card_idx_sel,
         )
 
+        # the card drawn this turn, until one card is dropped again
+        self.stash_card_rbtn_10 = Radiobutton(
+            self.stash_div, image=self.blank_card, variable=self.stash_card_idx_sel,
+        )
+
         self.stash_card_rbtn_list = [
             self.stash_card_rbtn_0,
             self.stash_card_rbtn_1,
@@ -104,6 +112,7 @@ class App(Tk):
             self.stash_card_rbtn_7,
             self.stash_card_rbtn_8,
             self.stash_card_rbtn_9,
+            self.stash_card_rbtn_10,
         ]
 
         # game deck
@@ -131,6 +140,8 @@ class App(Tk):
         )
         self.end_btn = Button(self.moves_div, text="End",
                               command=self.game_client.end)
+        self.hint_str = StringVar()
+        self.hint_label = Label(self.moves_div, textvariable=self.hint_str)
 
     def position_ui(self):
         self.server_connection_div.grid(row=0, column=0, padx=10, pady=10)
@@ -145,6 +156,7 @@ class App(Tk):
                 stash_card_rbtn = self.stash_card_rbtn_list[i]
                 stash_card_rbtn.grid(row=row, column=column)
                 i += 1
+        self.stash_card_rbtn_10.grid(row=0, column=5, rowspan=2, padx=(10, 0))
         for child in self.stash_div.winfo_children():
             child.configure(state=DISABLED)
 
@@ -158,6 +170,7 @@ class App(Tk):
         self.draw_btn.grid(row=0, column=1, padx=5)
         self.drop_btn.grid(row=0, column=2, padx=5)
         self.end_btn.grid(row=0, column=3, padx=5)
+        self.hint_label.grid(row=1, column=0, columnspan=4, pady=5)
         self.draw_btn.config(state=DISABLED)
         self.drop_btn.config(state=DISABLED)
         self.end_btn.config(state=DISABLED)
@@ -168,6 +181,17 @@ class GameClient(threading.Thread):
         super().__init__()
         self.app = app
 
+        self.commands = CommandParser()
+        self.commands.register("@ID", self.on_id, arg=WORD_ARG)
+        self.commands.register("@STASH", self.on_stash, arg=WORD_ARG)
+        self.commands.register("@STOCK", self.on_stock, arg=WORD_ARG)
+        self.commands.register("@DISCARD", self.on_discard, arg=WORD_ARG)
+        self.commands.register("@DRAWING", self.on_drawing)
+        self.commands.register("@DROPPING", self.on_dropping)
+        self.commands.register("@IDLE", self.on_idle)
+        self.commands.register("@END", self.end)
+        self.commands.register("@ERROR", self.on_error, arg=TEXT_ARG)
+
     def run(self):
         try:
             self.stash_deck = []
@@ -178,6 +202,7 @@ class GameClient(threading.Thread):
             self.is_dropping = False
             self.is_winner = False
             self.deadwood = 0
+            self.card_tracker = CardTracker()
 
             self.address = self.app.address_input_str.get()
             self.port = 65432
@@ -232,56 +257,67 @@ class GameClient(threading.Thread):
         logging.debug("TO SERVER --> " + str(data))
 
     def handle_command(self, command):
-        if "@ID " in command:
-            cmd = command.split(" ")
-            self.id = cmd[1]
-            logging.debug("Got client ID as " + str(self.id))
-        elif "@STASH" in command:
-            cmd = command.split(" ")
-            card = cmd[1][:2]
-            self.stash_deck.append(card)
-            logging.debug("Added " + str(card) + " to the stash deck")
-            if len(self.stash_deck) == 10:
-                for i in range(10):
-                    stash_card_rbtn = self.app.stash_card_rbtn_list[i]
-                    card = self.stash_deck[i]
-                    card_image = self.app.card_images[card]
-                    stash_card_rbtn.config(image=card_image, value=card)
-        elif "@STOCK" in command:
-            cmd = command.split(" ")
-            card = cmd[1][:2]
-            self.stock_top = card
-            if self.stock_top == None:
-                self.app.stock_deck_rbtn.config(image=self.app.blank_card)
-            else:
-                card = self.stock_top
-                card_image = self.app.card_images[card]
-                self.app.stock_deck_rbtn.config(image=card_image)
-            logging.debug("Set " + str(card) + " as the stock top")
-        elif "@DISCARD" in command:
-            cmd = command.split(" ")
-            card = cmd[1][:2]
-            self.discard_top = card
-            if self.discard_top == None:
-                self.app.discard_deck_rbtn.config(image=self.app.blank_card)
-            else:
-                card = self.discard_top
-                card_image = self.app.card_images[card]
-                self.app.discard_deck_rbtn.config(image=card_image)
-            logging.debug("Set " + str(card) + " as the discard top")
-        elif "@DRAWING" in command:
-            self.is_dropping = False
-            self.is_drawing = True
-            self.drawing()
-        elif "@DROPPING" in command:
-            self.is_dropping = True
-            self.is_drawing = False
-            self.dropping()
-        elif "@IDLE" in command:
-            self.is_drawing = False
-            self.is_dropping = False
-        elif "@END" in command:
-            self.end()
+        try:
+            self.commands.dispatch(command)
+        except ProtocolError as e:
+            logging.error("FROM SERVER --> " + str(e))
+
+    def on_id(self, id):
+        self.id = id
+        logging.debug("Got client ID as " + str(self.id))
+
+    def on_stash(self, card):
+        self.check_card(card)
+        self.stash_deck.append(card)
+        self.card_tracker.see(card)
+        logging.debug("Added " + str(card) + " to the stash deck")
+        if len(self.stash_deck) >= 10:
+            self.show_stash()
+
+    def on_stock(self, card):
+        self.check_card(card)
+        self.stock_top = card
+        self.card_tracker.see(card)
+        if self.stock_top == None:
+            self.app.stock_deck_rbtn.config(image=self.app.blank_card)
+        else:
+            card = self.stock_top
+            card_image = self.app.card_images[card]
+            self.app.stock_deck_rbtn.config(image=card_image)
+        logging.debug("Set " + str(card) + " as the stock top")
+
+    def on_discard(self, card):
+        self.check_card(card)
+        self.discard_top = card
+        self.card_tracker.see(card)
+        if self.discard_top == None:
+            self.app.discard_deck_rbtn.config(image=self.app.blank_card)
+        else:
+            card = self.discard_top
+            card_image = self.app.card_images[card]
+            self.app.discard_deck_rbtn.config(image=card_image)
+        logging.debug("Set " + str(card) + " as the discard top")
+
+    def check_card(self, card):
+        if card not in CARD_BIT:
+            raise ProtocolError("Unknown card " + repr(card))
+
+    def on_drawing(self):
+        self.is_dropping = False
+        self.is_drawing = True
+        self.drawing()
+
+    def on_dropping(self):
+        self.is_dropping = True
+        self.is_drawing = False
+        self.dropping()
+
+    def on_idle(self):
+        self.is_drawing = False
+        self.is_dropping = False
+
+    def on_error(self, message):
+        logging.error("Server rejected command --> " + message)
 
     def ready(self):
         data = "@READY;"
@@ -305,6 +341,7 @@ class GameClient(threading.Thread):
         for child in self.app.stash_div.winfo_children():
             child.configure(state=NORMAL)
         self.app.drop_btn.config(state=NORMAL)
+        self.show_hint()
 
     def idle(self):
         for child in self.app.deck_div.winfo_children():
@@ -323,26 +360,41 @@ class GameClient(threading.Thread):
 
     def drop(self):
         card = self.app.stash_card_idx_sel.get()
-        if card is not None:
+        if card in self.stash_deck:
             logging.debug("Stash Before --> " + str(self.stash_deck))
             logging.debug("Dropping --> " + str(card))
             self.stash_deck.remove(card)
             logging.debug("Stash After --> " + str(self.stash_deck))
             data = "@DROP " + card
             self.sendall(data)
-            if len(self.stash_deck) == 10:
-                for i in range(10):
-                    stash_card_rbtn = self.app.stash_card_rbtn_list[i]
-                    card = self.stash_deck[i]
-                    stash_card_rbtn.config(
-                        image=self.app.card_images[card], value=card)
+            self.show_stash()
             logging.debug("Stash {}".format(self.stash_deck))
             self.stock_top = None
             self.app.stock_deck_rbtn.config(image=self.app.blank_card)
             self.is_dropping = False
             self.idle()
+            self.app.hint_str.set("")
             self.calculate_deadwood()
 
+    def show_stash(self):
+        for i, stash_card_rbtn in enumerate(self.app.stash_card_rbtn_list):
+            if i < len(self.stash_deck):
+                card = self.stash_deck[i]
+                stash_card_rbtn.config(
+                    image=self.app.card_images[card], value=card)
+            else:
+                stash_card_rbtn.config(image=self.app.blank_card, value="")
+
+    def show_hint(self):
+        score = best_discard(self.stash_deck, self.card_tracker)
+        if score is None:
+            return
+        hint = "Hint: drop {} ({} outs, expected deadwood {:.1f})".format(
+            score.card, score.outs, score.expected_deadwood
+        )
+        self.app.hint_str.set(hint)
+        logging.debug(hint)
+
     def end(self):
         if self.is_winner:
             data = "@END"
@@ -350,101 +402,22 @@ class GameClient(threading.Thread):
             messagebox.showinfo("Congratulations!", "You won!")
         else:
             messagebox.showinfo("Game Over", "You lost!")
+        # The next deal starts from an empty stash with no cards seen.
+        self.stash_deck = []
+        self.card_tracker.reset()
 
     def calculate_deadwood(self):
-        self.deadwood = 0
-        cmb_3 = list(permutations(self.stash_deck, 3))
-        melds = self.get_melds(cmb_3)
-        if melds is not None:
-            self.deadwood_deck = self.stash_deck.copy()
-            for meld in melds:
-                for card in meld:
-                    if card in self.deadwood_deck:
-                        self.deadwood_deck.remove(card)
-
-            for card in self.deadwood_deck:
-                self.deadwood += self.calculate_rank(card)
-            logging.debug("DEADWOOD --> " + str(self.deadwood))
-
-            if len(self.deadwood_deck) < 2 and self.deadwood < 14:
-                self.app.end_btn.config(state=NORMAL)
-                self.is_winner = True
-            else:
-                self.app.end_btn.config(state=DISABLED)
-                self.is_winner = False
-
-    def get_melds(self, cmbs):
-        melds = []
-
-        while len(cmbs) > 0:
-            curr_cmb = cmbs.pop()
-            if self.is_meld(curr_cmb):
-                melds.append(curr_cmb)
-                to_remove_cmbs = set()
-                for card in curr_cmb:
-                    for cmb in cmbs:
-                        if card in cmb:
-                            to_remove_cmbs.add(cmb)
-                cmbs = list(set(cmbs).difference(to_remove_cmbs))
-
-        if len(melds) == 0:
-            return None
+        hand = card_mask(self.stash_deck)
+        self.deadwood_deck = mask_cards(deadwood_mask(hand))
+        self.deadwood = deadwood(hand)
+        logging.debug("DEADWOOD --> " + str(self.deadwood))
+
+        if is_win(hand):
+            self.app.end_btn.config(state=NORMAL)
+            self.is_winner = True
         else:
-            return melds
-
-    def is_meld(self, cmb):
-        meld_rank = cmb[0][0]
-        meld_suit = cmb[0][1]
-
-        is_rank_meld = False
-        for card in cmb:
-            rank = card[0]
-            suit = card[1]
-            if rank != meld_rank:
-                is_rank_meld = False
-                break
-            else:
-                is_rank_meld = True
-        if is_rank_meld:
-            return is_rank_meld
-
-        is_suit_meld = False
-        for idx in range(len(cmb)):
-            card = cmb[idx]
-            rank = card[0]
-            suit = card[1]
-            if suit != meld_suit:
-                is_suit_meld = False
-                break
-            else:
-                if idx == 0:
-                    continue
-                else:
-                    prev_card = cmb[idx - 1]
-                    if self.calculate_rank(card) == self.calculate_rank(prev_card) + 1:
-                        is_suit_meld = True
-                    else:
-                        is_suit_meld = False
-                        break
-        if is_suit_meld:
-            return is_suit_meld
-
-        return False
-
-    def calculate_rank(self, card):
-        rank = card[0]
-        if rank == "A":
-            return 1
-        elif rank == "T":
-            return 10
-        elif rank == "K":
-            return 13
-        elif rank == "Q":
-            return 12
-        elif rank == "J":
-            return 11
-        else:
-            return int(rank)
+            self.app.end_btn.config(state=DISABLED)
+            self.is_winner = False
 
 
 if __name__ == "__main__":
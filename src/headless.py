@@ -0,0 +1,177 @@
+import random
+
+from outs import best_discard, deadwood, is_win, out_mask
+from tracker import CARD_BIT, RANK, SUIT, CardTracker, card_mask
+
+# Same defaults as the networked game: 10 cards each, and a player wins once
+# fewer than 2 cards worth less than 14 are left out of melds (outs.is_win).
+RULES = {
+    "n_cards": 10,
+    "max_deadwood": 13,
+    "max_deadwood_cards": 1,
+    "max_turns": 200,
+}
+
+
+def check_rules(rules, n_players):
+    """Return RULES updated with rules, or raise ValueError for a bad rule."""
+    checked = dict(RULES)
+    for key, value in (rules or {}).items():
+        if key not in RULES:
+            raise ValueError("Unknown rule " + repr(key))
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise ValueError("Rule " + key + " must be an integer")
+        checked[key] = value
+
+    # Every player is dealt n_cards and one more card opens the discard pile.
+    max_cards = (52 - 1) // n_players
+    if not 1 <= checked["n_cards"] <= max_cards:
+        raise ValueError(
+            "n_cards must be between 1 and {} for {} players".format(
+                max_cards, n_players)
+        )
+    if checked["max_turns"] < 1:
+        raise ValueError("max_turns must be positive")
+    for key in ("max_deadwood", "max_deadwood_cards"):
+        if checked[key] < 0:
+            raise ValueError(key + " must not be negative")
+    return checked
+
+
+class RandomBot:
+    def __init__(self, rng):
+        self.rng = rng
+
+    def draw(self, stash_deck, discard_top, card_tracker):
+        return self.rng.choice(["STOCK", "DISCARD"])
+
+    def drop(self, stash_deck, discard_top, card_tracker):
+        return self.rng.choice(stash_deck)
+
+
+class GreedyBot:
+    def __init__(self, rng):
+        self.rng = rng
+
+    def draw(self, stash_deck, discard_top, card_tracker):
+        if discard_top is not None:
+            if out_mask(card_mask(stash_deck)) & CARD_BIT[discard_top]:
+                return "DISCARD"
+        return "STOCK"
+
+    def drop(self, stash_deck, discard_top, card_tracker):
+        return best_discard(stash_deck, card_tracker).card
+
+
+class LowballBot:
+    def __init__(self, rng):
+        self.rng = rng
+
+    def draw(self, stash_deck, discard_top, card_tracker):
+        return "STOCK"
+
+    def drop(self, stash_deck, discard_top, card_tracker):
+        hand = card_mask(stash_deck)
+        return min(stash_deck, key=lambda card: deadwood(hand ^ CARD_BIT[card]))
+
+
+STRATEGIES = {
+    "random": RandomBot,
+    "lowball": LowballBot,
+    "greedy": GreedyBot,
+}
+
+
+class HeadlessPlayer:
+    def __init__(self, id, bot):
+        self.id = id
+        self.bot = bot
+        self.stash_deck = []
+        self.card_tracker = CardTracker()
+
+    def stash(self, card):
+        self.stash_deck.append(card)
+        self.card_tracker.see(card)
+
+
+class HeadlessGame:
+    """Server draw/drop rules played in-process between bots, without sockets."""
+
+    def __init__(self, bots, rules=None, rng=None):
+        self.rules = check_rules(rules, len(bots))
+        self.rng = rng or random.Random()
+        self.players = [HeadlessPlayer(id, bot) for id, bot in enumerate(bots)]
+        self.turns = 0
+
+    def start_game(self):
+        self.stock_deck = [(r + s) for s in SUIT for r in RANK]
+        self.rng.shuffle(self.stock_deck)
+
+        for _ in range(self.rules["n_cards"]):
+            for player in self.players:
+                player.stash(self.stock_deck.pop())
+
+        self.discard_deck = []
+        self.discard(self.stock_deck.pop())
+
+    def play(self):
+        """Play until a player wins or max_turns runs out.
+
+        Returns the id of the winner, or None for a drawn game.
+        """
+        self.start_game()
+        while self.turns < self.rules["max_turns"]:
+            if not self.stock_deck and len(self.discard_deck) < 2:
+                return None
+            player = self.players[self.turns % len(self.players)]
+            self.turns += 1
+            self.play_turn(player)
+            if self.is_winner(player):
+                return player.id
+        return None
+
+    def play_turn(self, player):
+        discard_top = self.discard_deck[-1] if self.discard_deck else None
+        deck = player.bot.draw(player.stash_deck, discard_top, player.card_tracker)
+        if deck == "DISCARD" and self.discard_deck:
+            self.draw_discard(player)
+        elif deck in ("STOCK", "DISCARD"):
+            self.draw_stock(player)
+        else:
+            raise ValueError("Unknown deck " + repr(deck))
+
+        discard_top = self.discard_deck[-1] if self.discard_deck else None
+        card = player.bot.drop(player.stash_deck, discard_top, player.card_tracker)
+        if card not in player.stash_deck:
+            raise ValueError("Card " + repr(card) + " is not in the stash")
+        player.stash_deck.remove(card)
+        self.discard(card)
+
+    def draw_stock(self, player):
+        if not self.stock_deck:
+            # Turn the discard pile over, keeping its top card face up.
+            self.stock_deck = self.discard_deck[:-1]
+            self.stock_deck.reverse()
+            self.discard_deck = self.discard_deck[-1:]
+            # The turned over cards can be drawn again, so they are unseen.
+            for p in self.players:
+                p.card_tracker.reset()
+                for card in p.stash_deck + self.discard_deck:
+                    p.card_tracker.see(card)
+        player.stash(self.stock_deck.pop())
+
+    def draw_discard(self, player):
+        player.stash(self.discard_deck.pop())
+
+    def discard(self, card):
+        self.discard_deck.append(card)
+        for player in self.players:
+            player.card_tracker.see(card)
+
+    def is_winner(self, player):
+        # Same check as the client's End button, with this game's limits.
+        return is_win(
+            card_mask(player.stash_deck),
+            max_deadwood=self.rules["max_deadwood"],
+            max_deadwood_cards=self.rules["max_deadwood_cards"],
+        )
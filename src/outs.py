@@ -0,0 +1,189 @@
+from collections import namedtuple
+from functools import lru_cache
+
+from tracker import CARD_BIT, card_mask, mask_cards
+
+SUIT_BITS = 0x1FFF
+# One bit per suit lane, multiply a 13-bit rank mask by it to cover all suits.
+SUIT_LANES = 1 | 1 << 13 | 1 << 26 | 1 << 39
+# Drop value of an empty hand, where there is no card left to drop.
+NO_DROP = float("inf")
+
+# Deadwood value of every 13-bit suit mask, each card counting its rank:
+# A=1, 2-9 at face value, T=10, J=11, Q=12, K=13.
+SUIT_VALUE = [0] * (1 << 13)
+for _m in range(1, 1 << 13):
+    _low = _m & -_m
+    SUIT_VALUE[_m] = SUIT_VALUE[_m ^ _low] + _low.bit_length()
+
+DiscardScore = namedtuple(
+    "DiscardScore", ["card", "outs", "out_cards", "deadwood", "expected_deadwood"]
+)
+
+
+def split_suits(mask):
+    return [(mask >> (13 * s)) & SUIT_BITS for s in range(4)]
+
+
+def join_suits(suits):
+    mask = 0
+    for s, sm in enumerate(suits):
+        mask |= sm << (13 * s)
+    return mask
+
+
+def mask_value(mask):
+    value = 0
+    while mask:
+        value += SUIT_VALUE[mask & SUIT_BITS]
+        mask >>= 13
+    return value
+
+
+def out_mask(hand):
+    # Cards that would form a 3+ card meld together with any cards in hand,
+    # even ones already used by a better meld. Every suit is a 13-bit lane,
+    # so all ranks are tested at once.
+    a, b, c, d = split_suits(hand)
+    pairs = (a & b) | (a & c) | (a & d) | (b & c) | (b & d) | (c & d)
+    suits = []
+    for sm in (a, b, c, d):
+        run = ((sm >> 1) & (sm >> 2)) | ((sm << 1) & (sm >> 1)) | ((sm << 1) & (sm << 2))
+        suits.append((run | pairs) & SUIT_BITS)
+    return join_suits(suits) & ~hand
+
+
+@lru_cache(maxsize=1 << 18)
+def deadwood_cover(hand):
+    """Search the meld arrangements of hand.
+
+    Returns (deadwood value, deadwood card count, deadwood mask) of the best
+    arrangement, followed by the lowest deadwood value reachable when exactly
+    one card of hand is dropped first.
+
+    The lowest card of hand is either deadwood, the dropped card, or sits in
+    a meld that starts at it, since no lower card is left. Trying those few
+    options and caching every sub-hand keeps meld-dense hands as cheap as
+    scattered ones.
+    """
+    if not hand:
+        return 0, 0, 0, NO_DROP
+    low = hand & -hand
+    rank = (low.bit_length() - 1) % 13
+    value, n_dead, dead, drop = deadwood_cover(hand ^ low)
+    best = (value + rank + 1, n_dead + 1, dead | low)
+    best_drop = min(drop + rank + 1, value)
+
+    melds = []
+    run = low
+    for k in range(1, 13 - rank):
+        if not hand & (low << k):
+            break
+        run |= low << k
+        if k >= 2:
+            melds.append(run)
+    same = hand & (low * SUIT_LANES) & ~low
+    if same & (same - 1):
+        melds.append(low | same)
+        if bin(same).count("1") == 3:
+            rest = same
+            while rest:
+                bit = rest & -rest
+                melds.append(low | (same ^ bit))
+                rest ^= bit
+
+    for meld in melds:
+        cover = deadwood_cover(hand & ~meld)
+        if cover[:3] < best:
+            best = cover[:3]
+        if cover[3] < best_drop:
+            best_drop = cover[3]
+    return best + (best_drop,)
+
+
+def deadwood_mask(hand):
+    """Return the cards left unmelded by the best meld arrangement of hand."""
+    return deadwood_cover(hand)[2]
+
+
+def deadwood(hand):
+    """Return the deadwood value of the best meld arrangement of hand."""
+    return deadwood_cover(hand)[0]
+
+
+def is_win(hand, max_deadwood=13, max_deadwood_cards=1):
+    """Return whether the best meld arrangement of hand wins the game."""
+    value, n_dead, _, _ = deadwood_cover(hand)
+    return n_dead <= max_deadwood_cards and value <= max_deadwood
+
+
+def drop_deadwood(hand):
+    """Return the lowest deadwood reachable by dropping one card of hand."""
+    return deadwood_cover(hand)[3]
+
+
+def score_discards(stash_deck, card_tracker):
+    """Score every card of the stash as a discard candidate.
+
+    For each candidate the score holds its outs, the deadwood of the
+    remaining hand, and the expected deadwood after drawing one unseen card
+    and dropping the best card again. An out is an unseen card that lowers
+    the deadwood of the remaining hand once drawn, so it melds in the best
+    arrangement rather than only next to cards that sit in a better meld.
+    """
+    hand = card_mask(stash_deck)
+    unseen = card_tracker.unseen(stash_deck)
+    n_unseen = bin(unseen).count("1")
+
+    scores = []
+    for card in stash_deck:
+        rest = hand & ~CARD_BIT[card]
+        base = deadwood(rest)
+        # Only these cards can join a meld, the rest stay deadwood for sure.
+        meldable = out_mask(rest) & unseen
+
+        if n_unseen == 0:
+            scores.append(DiscardScore(card, 0, [], base, float(base)))
+            continue
+
+        # A drawn card that is not meldable joins no meld, so the player either
+        # drops it again (deadwood stays at base) or keeps it and drops the
+        # best card of the rest. Keeping it only pays off for cards worth less
+        # than that gain, which are picked out for all suits at once.
+        drop = drop_deadwood(rest)
+        gain = base - drop
+        low = ((1 << (gain - 1)) - 1) * SUIT_LANES if gain > 1 else 0
+        others = unseen & ~meldable
+        below = others & low
+        total = (
+            bin(others).count("1") * base
+            + mask_value(below)
+            - bin(below).count("1") * gain
+        )
+
+        outs = 0
+        mask = meldable
+        while mask:
+            bit = mask & -mask
+            total += drop_deadwood(rest | bit)
+            if deadwood(rest | bit) < base + mask_value(bit):
+                outs |= bit
+            mask ^= bit
+
+        scores.append(
+            DiscardScore(
+                card,
+                bin(outs).count("1"),
+                mask_cards(outs),
+                base,
+                total / n_unseen,
+            )
+        )
+    return scores
+
+
+def best_discard(stash_deck, card_tracker):
+    scores = score_discards(stash_deck, card_tracker)
+    if not scores:
+        return None
+    return min(scores, key=lambda score: (score.expected_deadwood, -score.outs))
@@ -0,0 +1,51 @@
+NO_ARG = 0
+WORD_ARG = 1
+TEXT_ARG = 2
+
+
+class ProtocolError(Exception):
+    pass
+
+
+class CommandParser:
+    def __init__(self):
+        self.handlers = {}
+
+    def register(self, verb, handler, arg=NO_ARG):
+        if not verb.startswith("@") or " " in verb:
+            raise ValueError("Invalid verb " + repr(verb))
+        self.handlers[verb] = (handler, arg)
+
+    def parse(self, command):
+        # Commands look like "@VERB" or "@VERB ARG", optionally ending in ";".
+        # The verb is sliced out up to the first space and looked up in the
+        # handler table, so "@DRAWING" never matches "@DRAW" and the cost of
+        # a lookup does not grow with the number of verbs.
+        if not command.startswith("@"):
+            raise ProtocolError("Malformed command " + repr(command))
+        end = len(command) - 1 if command.endswith(";") else len(command)
+        space = command.find(" ", 1, end)
+        verb = command[:end] if space == -1 else command[:space]
+
+        entry = self.handlers.get(verb)
+        if entry is None:
+            raise ProtocolError("Unknown command " + repr(verb))
+        handler, arg_kind = entry
+
+        if space == -1:
+            if arg_kind != NO_ARG:
+                raise ProtocolError("Missing argument for " + verb)
+            return handler, None
+        if arg_kind == NO_ARG:
+            raise ProtocolError("Unexpected argument for " + verb)
+        if space + 1 == end:
+            raise ProtocolError("Missing argument for " + verb)
+        if arg_kind == WORD_ARG and command.find(" ", space + 1, end) != -1:
+            raise ProtocolError("Too many arguments for " + verb)
+        return handler, command[space + 1:end]
+
+    def dispatch(self, command):
+        handler, arg = self.parse(command)
+        if arg is None:
+            return handler()
+        return handler(arg)
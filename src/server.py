@@ -7,6 +7,8 @@ from tkinter import StringVar, Tk, messagebox
 from tkinter.constants import DISABLED
 from tkinter.ttk import Button, Entry, Frame, Label
 
+from protocol import WORD_ARG, CommandParser, ProtocolError
+
 logging.basicConfig(level=logging.DEBUG)
 
 SUIT = ["H", "C", "S", "D"]
@@ -120,6 +122,12 @@ class Player:
     def __init__(self, game_server):
         self.game_server = game_server
 
+        self.commands = CommandParser()
+        self.commands.register("@READY", self.on_ready)
+        self.commands.register("@DRAW", self.on_draw, arg=WORD_ARG)
+        self.commands.register("@DROP", self.on_drop, arg=WORD_ARG)
+        self.commands.register("@END", self.end)
+
     def run(self, id, client):
         self.id = id
         self.client = client
@@ -167,40 +175,46 @@ class Player:
         logging.debug("TO CLIENT {} --> ".format(self.id) + str(data))
 
     def handle_command(self, command):
-        if "@READY" in command:
-            self.is_ready = True
-        elif "@DRAW" in command:
-            cmd = command.split()
-            deck = cmd[1]
-            if deck == "STOCK":
-                self.draw_stock()
-            elif deck == "DISCARD":
-                self.draw_discard()
-            self.is_drawing = False
-            self.is_dropping = True
-            data = "@DROPPING"
-            self.sendall(data)
-        elif "@DROP" in command:
-            cmd = command.split(" ")
-            card = cmd[1]
-            self.drop(card)
-            self.is_drawing = False
-            self.is_dropping = False
-            data = "@IDLE"
+        try:
+            self.commands.dispatch(command)
+        except ProtocolError as e:
+            logging.error("FROM CLIENT {} --> ".format(self.id) + str(e))
+            data = "@ERROR " + str(e)
             self.sendall(data)
 
-            n_players = len(self.game_server.players)
-            if self.id + 1 >= n_players:
-                next_id = 0
-            else:
-                next_id = self.id + 1
-            next_player = self.game_server.players[next_id]
-            next_player.is_drawing = True
-            data = "@DRAWING"
-            next_player.sendall(data)
-
-        elif "@END" in command:
-            self.end()
+    def on_ready(self):
+        self.is_ready = True
+
+    def on_draw(self, deck):
+        if deck == "STOCK":
+            self.draw_stock()
+        elif deck == "DISCARD":
+            self.draw_discard()
+        else:
+            raise ProtocolError("Unknown deck " + repr(deck))
+        self.is_drawing = False
+        self.is_dropping = True
+        data = "@DROPPING"
+        self.sendall(data)
+
+    def on_drop(self, card):
+        if card not in self.stash_deck:
+            raise ProtocolError("Card " + repr(card) + " is not in the stash")
+        self.drop(card)
+        self.is_drawing = False
+        self.is_dropping = False
+        data = "@IDLE"
+        self.sendall(data)
+
+        n_players = len(self.game_server.players)
+        if self.id + 1 >= n_players:
+            next_id = 0
+        else:
+            next_id = self.id + 1
+        next_player = self.game_server.players[next_id]
+        next_player.is_drawing = True
+        data = "@DRAWING"
+        next_player.sendall(data)
 
     def draw_stock(self):
         card = self.game_server.stock_deck.pop()
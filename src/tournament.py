@@ -0,0 +1,467 @@
+import argparse
+import json
+import logging
+import math
+import os
+import random
+from multiprocessing import Pool
+
+from headless import RULES, STRATEGIES, HeadlessGame, check_rules
+
+SCHEDULES = ["round-robin", "swiss"]
+
+
+class CheckpointError(Exception):
+    pass
+
+
+def play_match(task):
+    # Runs in a worker process, so it only takes and returns plain data.
+    rng = random.Random("{}:{}".format(task["seed"], task["id"]))
+    bots = [STRATEGIES[name](rng) for name in task["players"]]
+    game = HeadlessGame(bots, rules=task["rules"], rng=rng)
+    winner = game.play()
+    return {
+        "id": task["id"],
+        "players": task["players"],
+        "winner": winner,
+        "turns": game.turns,
+    }
+
+
+ELO_SCALE = 400 / math.log(10)
+
+
+def fit_ratings(names, versus, prior=1.0):
+    """Fit Bradley-Terry ratings to pairwise results, on the Elo scale.
+
+    versus[a][b] holds [games, points of a] for a against b. Every player
+    also gets prior virtual draws against a fixed 1500 player, which keeps
+    the ratings of players who won or lost every game finite. Returns
+    {name: (rating, standard error)}, with ratings centered so the field
+    averages 1500.
+    """
+    gamma = {name: 1.0 for name in names}
+    for _ in range(10000):
+        # Minorization-maximization step of the Bradley-Terry likelihood.
+        new = {}
+        for a in names:
+            points = prior / 2
+            weight = prior / (gamma[a] + 1)
+            for b, (games, score) in versus[a].items():
+                points += score
+                weight += games / (gamma[a] + gamma[b])
+            new[a] = points / weight
+        change = max(abs(math.log(new[name] / gamma[name])) for name in names)
+        gamma = new
+        if change < 1e-10:
+            break
+
+    # The inverse of the Fisher information gives the standard errors.
+    theta = {name: math.log(gamma[name]) for name in names}
+    index = {name: i for i, name in enumerate(names)}
+    info = [[0.0] * len(names) for _ in names]
+    for a in names:
+        p = 1 / (1 + math.exp(-theta[a]))
+        info[index[a]][index[a]] += prior * p * (1 - p)
+        for b, (games, _) in versus[a].items():
+            p = 1 / (1 + math.exp(theta[b] - theta[a]))
+            info[index[a]][index[a]] += games * p * (1 - p)
+            info[index[a]][index[b]] -= games * p * (1 - p)
+    covariance = invert(info)
+
+    # Center on the field average. The uncertainty shared by every rating,
+    # how strong the whole field is against the fixed player, drops out.
+    n = len(names)
+    mean = sum(theta.values()) / n
+    total = sum(sum(row) for row in covariance) / (n * n)
+    ratings = {}
+    for name in names:
+        i = index[name]
+        variance = covariance[i][i] - 2 * sum(covariance[i]) / n + total
+        ratings[name] = (
+            1500 + ELO_SCALE * (theta[name] - mean),
+            ELO_SCALE * math.sqrt(max(variance, 0.0)),
+        )
+    return ratings
+
+
+def invert(matrix):
+    # Gauss-Jordan elimination with partial pivoting.
+    n = len(matrix)
+    rows = [row[:] + [float(i == j) for j in range(n)] for i, row in enumerate(matrix)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(rows[r][col]))
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        scale = rows[col][col]
+        rows[col] = [x / scale for x in rows[col]]
+        for r in range(n):
+            if r != col and rows[r][col]:
+                factor = rows[r][col]
+                rows[r] = [x - factor * y for x, y in zip(rows[r], rows[col])]
+    return [row[n:] for row in rows]
+
+
+class Summary:
+    def __init__(self, names):
+        self.names = names
+        self.stats = {
+            name: {"games": 0, "wins": 0, "losses": 0, "draws": 0} for name in names
+        }
+        self.versus = {name: {} for name in names}
+        self.games = 0
+        self.turns = 0
+
+    def add(self, result):
+        self.games += 1
+        self.turns += result["turns"]
+        for id, name in enumerate(result["players"]):
+            stats = self.stats[name]
+            stats["games"] += 1
+            if result["winner"] is None:
+                stats["draws"] += 1
+            elif result["winner"] == id:
+                stats["wins"] += 1
+            else:
+                stats["losses"] += 1
+
+        for id, name in enumerate(result["players"]):
+            for other_id, other in enumerate(result["players"]):
+                if other_id == id:
+                    continue
+                if result["winner"] is None:
+                    points = 0.5
+                else:
+                    points = float(result["winner"] == id)
+                pair = self.versus[name].setdefault(other, [0, 0.0])
+                pair[0] += 1
+                pair[1] += points
+
+    def points(self, name):
+        stats = self.stats[name]
+        return stats["wins"] + 0.5 * stats["draws"]
+
+    def standings(self):
+        """Rank players by Bradley-Terry Elo, with 95% intervals.
+
+        Ratings are fitted to the pairwise results, so they account for the
+        strength of each opponent and do not depend on the order in which
+        results arrive from the workers.
+        """
+        ratings = fit_ratings(self.names, self.versus)
+        rows = []
+        for name in self.names:
+            stats = self.stats[name]
+            n = stats["games"]
+            elo, error = ratings[name]
+            rows.append(
+                dict(
+                    stats,
+                    name=name,
+                    score=self.points(name) / n if n else 0.0,
+                    elo=elo,
+                    elo_low=elo - 1.96 * error,
+                    elo_high=elo + 1.96 * error,
+                )
+            )
+        rows.sort(key=lambda row: row["elo"], reverse=True)
+        return rows
+
+    def format(self):
+        lines = [
+            "{:<12} {:>6} {:>6} {:>6} {:>6} {:>7} {:>7} {:>17}".format(
+                "Strategy", "Games", "Wins", "Losses", "Draws", "Score", "Elo", "95% CI"
+            )
+        ]
+        for row in self.standings():
+            interval = "{:.0f} .. {:.0f}".format(row["elo_low"], row["elo_high"])
+            lines.append(
+                "{:<12} {:>6} {:>6} {:>6} {:>6} {:>7.3f} {:>7.0f} {:>17}".format(
+                    row["name"],
+                    row["games"],
+                    row["wins"],
+                    row["losses"],
+                    row["draws"],
+                    row["score"],
+                    row["elo"],
+                    interval,
+                )
+            )
+        if self.games:
+            lines.append(
+                "{} games, {:.1f} turns per game".format(
+                    self.games, self.turns / self.games)
+            )
+        return "\n".join(lines)
+
+
+class Tournament:
+    def __init__(
+        self,
+        strategies,
+        schedule="round-robin",
+        rounds=None,
+        games=2,
+        rules=None,
+        seed=0,
+        workers=None,
+        checkpoint=None,
+    ):
+        for name in strategies:
+            if name not in STRATEGIES:
+                raise ValueError("Unknown strategy " + repr(name))
+        if len(set(strategies)) != len(strategies) or len(strategies) < 2:
+            raise ValueError("Need at least 2 distinct strategies")
+        if schedule not in SCHEDULES:
+            raise ValueError("Unknown schedule " + repr(schedule))
+        if games < 1:
+            raise ValueError("Need at least 1 game per pairing")
+        if rounds is not None and rounds < 1:
+            raise ValueError("Need at least 1 round")
+
+        self.strategies = list(strategies)
+        self.schedule = schedule
+        if rounds is None:
+            rounds = max(1, math.ceil(math.log2(len(strategies))))
+        self.rounds = rounds
+        self.games = games
+        # Matches are played between 2 players, so check the rules for that
+        # here rather than letting a bad value fail inside a worker.
+        self.rules = check_rules(rules, 2)
+        self.seed = seed
+        self.workers = workers or os.cpu_count() or 1
+        self.checkpoint = checkpoint
+
+        self.results = {}
+        self.summary = Summary(self.strategies)
+        self.checkpoint_file = None
+
+    def config(self):
+        config = {
+            "strategies": self.strategies,
+            "schedule": self.schedule,
+            "games": self.games,
+            "rules": self.rules,
+            "seed": self.seed,
+        }
+        # Round-robin ignores rounds, so it must not block a resume.
+        if self.schedule == "swiss":
+            config["rounds"] = self.rounds
+        return config
+
+    def task(self, id, players):
+        return {
+            "id": id,
+            "players": players,
+            "rules": self.rules,
+            "seed": self.seed,
+        }
+
+    def pairing_tasks(self, prefix, a, b):
+        # Alternate who moves first so neither side keeps the first turn.
+        tasks = []
+        for g in range(self.games):
+            players = [a, b] if g % 2 == 0 else [b, a]
+            tasks.append(self.task("{}:{}:{}:{}".format(prefix, a, b, g), players))
+        return tasks
+
+    def round_robin(self):
+        tasks = []
+        for i, a in enumerate(self.strategies):
+            for b in self.strategies[i + 1:]:
+                tasks.extend(self.pairing_tasks("rr", a, b))
+        return tasks
+
+    def swiss_round(self, round, standing, played, byes):
+        # Pair players with the closest score they have not met yet. Ties are
+        # broken by entry order, so a resumed run pairs rounds identically.
+        def points(name):
+            return standing.points(name) + byes.get(name, 0) * self.games
+
+        order = sorted(
+            self.strategies,
+            key=lambda name: (-points(name), self.strategies.index(name)),
+        )
+        if len(order) % 2 == 1:
+            for name in reversed(order):
+                if name not in byes:
+                    break
+            else:
+                name = order[-1]
+            order.remove(name)
+            byes[name] = byes.get(name, 0) + 1
+
+        tasks = []
+        while order:
+            a = order.pop(0)
+            b = next((name for name in order if (a, name) not in played), order[0])
+            order.remove(b)
+            played.add((a, b))
+            played.add((b, a))
+            tasks.extend(self.pairing_tasks("swiss{}".format(round), a, b))
+        return tasks
+
+    def run(self, on_result=None):
+        self.load_checkpoint()
+        try:
+            if self.workers == 1:
+                self.run_schedule(map, on_result)
+            else:
+                with Pool(self.workers) as pool:
+                    # chunksize=1 hands out one match at a time, so a worker
+                    # that finishes early takes the next match instead of
+                    # waiting on a fixed shard.
+                    def imap(func, tasks):
+                        return pool.imap_unordered(func, tasks, chunksize=1)
+
+                    self.run_schedule(imap, on_result)
+        finally:
+            if self.checkpoint_file is not None:
+                self.checkpoint_file.close()
+                self.checkpoint_file = None
+        return self.summary
+
+    def run_schedule(self, imap, on_result):
+        if self.schedule == "round-robin":
+            self.run_tasks(self.round_robin(), imap, on_result)
+        else:
+            # Pairings only look at earlier rounds, even when the results of
+            # later rounds were already loaded from a checkpoint.
+            standing = Summary(self.strategies)
+            played = set()
+            byes = {}
+            for round in range(self.rounds):
+                tasks = self.swiss_round(round, standing, played, byes)
+                self.run_tasks(tasks, imap, on_result)
+                for task in tasks:
+                    standing.add(self.results[task["id"]])
+
+    def run_tasks(self, tasks, imap, on_result):
+        pending = [task for task in tasks if task["id"] not in self.results]
+        for result in imap(play_match, pending):
+            self.record(result)
+            if on_result is not None:
+                on_result(result, self.summary)
+
+    def record(self, result, save=True):
+        self.results[result["id"]] = result
+        self.summary.add(result)
+        if save and self.checkpoint_file is not None:
+            self.checkpoint_file.write(json.dumps(result) + "\n")
+            self.checkpoint_file.flush()
+            os.fsync(self.checkpoint_file.fileno())
+
+    def load_checkpoint(self):
+        if self.checkpoint is None:
+            return
+        config = json.loads(json.dumps(self.config()))
+        if os.path.exists(self.checkpoint):
+            with open(self.checkpoint) as f:
+                lines = f.read().splitlines()
+            if lines:
+                try:
+                    header = json.loads(lines[0])
+                except ValueError:
+                    raise CheckpointError(
+                        "Checkpoint " + self.checkpoint + " has a broken header line, "
+                        "remove it to start over"
+                    )
+                if header != config:
+                    raise CheckpointError(
+                        "Checkpoint " + self.checkpoint + " belongs to another tournament"
+                    )
+            for line in lines[1:]:
+                try:
+                    result = json.loads(line)
+                    id = result["id"]
+                except (ValueError, TypeError, KeyError):
+                    # A line cut short by an interrupted write is replayed.
+                    logging.warning("Skipping broken checkpoint line " + repr(line))
+                    continue
+                if id not in self.results:
+                    self.record(result, save=False)
+            logging.info(
+                "Resumed {} games from {}".format(len(self.results), self.checkpoint)
+            )
+
+        # Write the cleaned up results next to the checkpoint and swap it in
+        # only once they are on disk, so an interrupted resume loses nothing.
+        temp = self.checkpoint + ".tmp"
+        with open(temp, "w") as f:
+            f.write(json.dumps(config) + "\n")
+            for result in self.results.values():
+                f.write(json.dumps(result) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, self.checkpoint)
+        self.checkpoint_file = open(self.checkpoint, "a")
+
+
+def parse_rule(text):
+    key, sep, value = text.partition("=")
+    if not sep or key not in RULES:
+        raise argparse.ArgumentTypeError("Expected <rule>=<int>, rules: " +
+                                         ", ".join(RULES))
+    try:
+        value = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("Rule values must be integers")
+    try:
+        check_rules({key: value}, 2)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return key, value
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Play headless bot tournaments.")
+    parser.add_argument("--strategies", nargs="+", default=list(STRATEGIES),
+                        choices=list(STRATEGIES))
+    parser.add_argument("--schedule", default="round-robin", choices=SCHEDULES)
+    parser.add_argument("--rounds", type=int, help="rounds of a swiss schedule")
+    parser.add_argument("--games", type=int, default=2,
+                        help="games per pairing")
+    parser.add_argument("--rule", type=parse_rule, action="append", default=[],
+                        help="override a game rule, e.g. max_deadwood=10")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--checkpoint", help="file to save and resume results")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        tournament = Tournament(
+            args.strategies,
+            schedule=args.schedule,
+            rounds=args.rounds,
+            games=args.games,
+            rules=dict(args.rule),
+            seed=args.seed,
+            workers=args.workers,
+            checkpoint=args.checkpoint,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+
+    def on_result(result, summary):
+        players = result["players"]
+        if result["winner"] is None:
+            outcome = "drew"
+        else:
+            outcome = "won by " + players[result["winner"]]
+        logging.info(
+            "[{}] {} vs {} {} in {} turns".format(
+                summary.games, players[0], players[1], outcome, result["turns"]
+            )
+        )
+
+    try:
+        summary = tournament.run(on_result)
+    except CheckpointError as e:
+        parser.error(str(e))
+    print(summary.format())
+
+
+if __name__ == "__main__":
+    main()
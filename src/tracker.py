@@ -0,0 +1,40 @@
+SUIT = ["H", "C", "S", "D"]
+RANK = ["A", "2", "3", "4", "5", "6", "7", "8", "9", "T", "J", "Q", "K"]
+
+# Each card maps to one bit of a 52-bit mask: 13 rank bits per suit, suits
+# laid out in SUIT order, ranks in RANK order (ace low).
+CARD_BIT = {
+    (r + s): 1 << (SUIT.index(s) * 13 + RANK.index(r)) for s in SUIT for r in RANK
+}
+BIT_CARD = {bit: card for card, bit in CARD_BIT.items()}
+FULL_DECK = (1 << 52) - 1
+
+
+def card_mask(cards):
+    mask = 0
+    for card in cards:
+        mask |= CARD_BIT[card]
+    return mask
+
+
+def mask_cards(mask):
+    cards = []
+    while mask:
+        bit = mask & -mask
+        cards.append(BIT_CARD[bit])
+        mask ^= bit
+    return cards
+
+
+class CardTracker:
+    def __init__(self):
+        self.seen = 0
+
+    def see(self, card):
+        self.seen |= CARD_BIT[card]
+
+    def unseen(self, stash_deck):
+        return FULL_DECK & ~(self.seen | card_mask(stash_deck))
+
+    def reset(self):
+        self.seen = 0